@@ -1,11 +1,73 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql.dml import UpdateBase
 from .config import get_settings
 
 settings = get_settings()
 
-engine = create_engine(settings.database_url)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+is_sqlite = make_url(settings.database_url).get_backend_name() == "sqlite"
+
+# Both dialects support INSERT ... ON CONFLICT ... RETURNING
+insert = sqlite.insert if is_sqlite else postgresql.insert
+
+
+def create_sqlite_engine(**kwargs):
+    """Create a SQLite engine with WAL and the tuned pragmas on every connection."""
+    sqlite_engine = create_engine(
+        settings.database_url,
+        connect_args={"check_same_thread": False},
+        **kwargs
+    )
+
+    @event.listens_for(sqlite_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}")
+        cursor.close()
+
+    return sqlite_engine
+
+
+class RoutingSession(Session):
+    """Session that reads from the reader pool and writes through the single writer.
+
+    Once a transaction has written it stays on the writer, so it keeps seeing
+    its own uncommitted changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase) or self.info.get("wrote"):
+            self.info["wrote"] = True
+            return engine
+        return reader_engine
+
+
+if is_sqlite:
+    # SQLite allows one writer at a time; a single pooled writer connection
+    # queues writes in-process instead of spinning on SQLITE_BUSY
+    engine = create_sqlite_engine(pool_size=1, max_overflow=0)
+    reader_engine = create_sqlite_engine(
+        pool_size=settings.sqlite_reader_pool_size,
+        max_overflow=0
+    )
+    SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
+    @event.listens_for(RoutingSession, "after_commit")
+    @event.listens_for(RoutingSession, "after_rollback")
+    def reset_writer_route(session):
+        session.info.pop("wrote", None)
+else:
+    engine = create_engine(settings.database_url)
+    reader_engine = engine
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
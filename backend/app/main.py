@@ -1,15 +1,31 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .database import engine, Base
-from .routers import rooms, questions, websocket
+from .routers import rooms, questions, websocket, stats
+from .routers.websocket import manager
+from .services.analytics_service import analytics
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    flusher = asyncio.create_task(analytics.run_flusher())
+    heartbeat = asyncio.create_task(manager.run_heartbeat())
+    yield
+    heartbeat.cancel()
+    flusher.cancel()
+    await asyncio.to_thread(analytics.flush)
+
+
 app = FastAPI(
     title="Card Game API",
     description="API for 'We Are Not Really Strangers' style card game",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -25,6 +41,7 @@ app.add_middleware(
 app.include_router(rooms.router)
 app.include_router(questions.router)
 app.include_router(websocket.router)
+app.include_router(stats.router)
 
 
 @app.get("/")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, Text, DateTime, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -24,14 +24,23 @@ class Room(Base):
     current_card_id = Column(Integer, ForeignKey("questions.id"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    version = Column(Integer, nullable=False, server_default="0")
 
     current_card = relationship("Question", foreign_keys=[current_card_id])
     players = relationship("Player", back_populates="room", cascade="all, delete-orphan")
     history = relationship("GameHistory", back_populates="room", cascade="all, delete-orphan")
 
+    # Every ORM UPDATE becomes compare-and-set on version and raises
+    # StaleDataError if another session changed the row first
+    __mapper_args__ = {"version_id_col": version}
+
 
 class Player(Base):
     __tablename__ = "players"
+    __table_args__ = (
+        # Target for ON CONFLICT in room_service.join_room
+        UniqueConstraint("room_id", "player_id", name="uq_players_room_player"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     room_id = Column(Integer, ForeignKey("rooms.id", ondelete="CASCADE"), nullable=False)
@@ -53,3 +62,25 @@ class GameHistory(Base):
 
     room = relationship("Room", back_populates="history")
     question = relationship("Question")
+
+
+class QuestionStats(Base):
+    __tablename__ = "question_stats"
+
+    # No foreign key: counters outlive deleted custom questions, and batched
+    # upserts must not fail because one question disappeared
+    question_id = Column(Integer, primary_key=True)
+    drawn_count = Column(Integer, nullable=False, default=0)
+    switched_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+
+
+class RoomSession(Base):
+    __tablename__ = "room_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    room_code = Column(String(6), nullable=False, index=True)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    ended_at = Column(DateTime(timezone=True), nullable=True)
+    cards_drawn = Column(Integer, nullable=False, default=0)
+    cards_switched = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,15 @@
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response encoded with orjson.
+
+    Endpoints return this with plain dicts built from selected columns, which
+    skips ORM hydration and response_model re-validation. response_model is
+    kept on the route so the OpenAPI schema is unchanged. Datetimes are
+    encoded the same way Pydantic does (UTC as "Z").
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+import zlib
+import anyio
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List
 from ..database import get_db
+from ..responses import FastJSONResponse
 from ..schemas import QuestionCreate, QuestionResponse
-from ..services import game_service
-from ..models import Question
+from ..services import game_service, room_service, export_service
+from .websocket import revoke_prefetched_question
 
 router = APIRouter(prefix="/api/questions", tags=["questions"])
 
@@ -12,8 +15,8 @@ router = APIRouter(prefix="/api/questions", tags=["questions"])
 @router.get("", response_model=List[QuestionResponse])
 def get_system_questions(db: Session = Depends(get_db)):
     """Get all system questions."""
-    questions = db.query(Question).filter(Question.is_system == True).all()
-    return questions
+    questions = game_service.get_system_questions(db)
+    return FastJSONResponse(questions)
 
 
 @router.post("", response_model=QuestionResponse)
@@ -34,14 +37,32 @@ def create_question(question_data: QuestionCreate, db: Session = Depends(get_db)
 def get_room_questions(room_code: str, db: Session = Depends(get_db)):
     """Get all questions available for a room (system + custom)."""
     questions = game_service.get_room_questions(db, room_code)
-    return questions
+    return FastJSONResponse(questions)
 
 
 @router.get("/custom/{room_code}", response_model=List[QuestionResponse])
 def get_custom_questions(room_code: str, db: Session = Depends(get_db)):
     """Get only custom questions for a room."""
     questions = game_service.get_custom_questions(db, room_code)
-    return questions
+    return FastJSONResponse(questions)
+
+
+@router.post("/custom/{room_code}/import")
+def import_custom_questions(room_code: str, file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """Bulk import custom questions from a room export (NDJSON or gzip)."""
+    room = room_service.get_room_by_code(db, room_code)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    try:
+        imported = export_service.import_custom_questions(
+            db, room.room_code, export_service.iter_ndjson(file.file)
+        )
+    except (ValueError, KeyError, zlib.error):
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Invalid export file")
+
+    return {"message": "Questions imported", "imported": imported}
 
 
 @router.delete("/{question_id}")
@@ -50,4 +71,7 @@ def delete_question(question_id: int, room_code: str, db: Session = Depends(get_
     deleted = game_service.delete_custom_question(db, question_id, room_code)
     if not deleted:
         raise HTTPException(status_code=404, detail="Question not found or cannot be deleted")
+
+    # Players may hold the question as a prefetched card; revoke it on the loop
+    anyio.from_thread.run(revoke_prefetched_question, room_code, question_id)
     return {"message": "Question deleted"}
@@ -1,8 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from ..database import get_db
+from ..responses import FastJSONResponse
 from ..schemas import RoomCreate, RoomJoin, RoomResponse, RoomBasicResponse
-from ..services import room_service
+from ..services import room_service, export_service
+from ..services.analytics_service import analytics
 
 router = APIRouter(prefix="/api/rooms", tags=["rooms"])
 
@@ -17,10 +20,10 @@ def create_room(room_data: RoomCreate, db: Session = Depends(get_db)):
 @router.get("/{room_code}", response_model=RoomResponse)
 def get_room(room_code: str, db: Session = Depends(get_db)):
     """Get room details by code."""
-    room = room_service.get_room_by_code(db, room_code)
+    room = room_service.get_room_payload(db, room_code)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
-    return room
+    return FastJSONResponse(room)
 
 
 @router.get("/{room_code}/exists", response_model=RoomBasicResponse)
@@ -39,27 +42,41 @@ def check_room_exists(room_code: str, db: Session = Depends(get_db)):
 @router.post("/{room_code}/join", response_model=RoomResponse)
 def join_room(room_code: str, join_data: RoomJoin, db: Session = Depends(get_db)):
     """Join an existing room."""
-    room = room_service.get_room_by_code(db, room_code)
+    room_service.join_room(db, room_code, join_data)
+
+    # Load after the upsert so the new player is already in the list
+    room = room_service.get_room_payload(db, room_code)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
-    if room.status == "ended":
+    if room["status"] == "ended":
         raise HTTPException(status_code=400, detail="Game has ended")
 
-    room_service.join_room(db, room, join_data)
-
-    # Refresh to get updated players
-    db.refresh(room)
-    return room
+    return FastJSONResponse(room)
 
 
 @router.delete("/{room_code}/leave/{player_id}")
 def leave_room(room_code: str, player_id: str, db: Session = Depends(get_db)):
     """Leave a room."""
+    room_deleted = room_service.leave_room(db, room_code, player_id)
+    if room_deleted is None:
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    if room_deleted:
+        analytics.record_room_closed(room_code.upper())
+    return {"message": "Left room", "room_deleted": room_deleted}
+
+
+@router.get("/{room_code}/export")
+def export_room(room_code: str, compress: bool = False, db: Session = Depends(get_db)):
+    """Stream a room's played history and custom deck as NDJSON (gzip if compress)."""
     room = room_service.get_room_by_code(db, room_code)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
 
-    room_deleted = room_service.leave_room(db, room, player_id)
-
-    return {"message": "Left room", "room_deleted": room_deleted}
+    filename = f"room-{room.room_code}.ndjson" + (".gz" if compress else "")
+    return StreamingResponse(
+        export_service.stream_room_export(room.room_code, compress),
+        media_type="application/gzip" if compress else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
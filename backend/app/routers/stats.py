@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from ..database import get_db
+from ..models import QuestionStats
+from ..schemas import StatsResponse
+from ..services import analytics_service
+
+router = APIRouter(prefix="/api/stats", tags=["stats"])
+
+
+@router.get("", response_model=StatsResponse)
+def get_stats(limit: int = Query(10, ge=1, le=100), db: Session = Depends(get_db)):
+    """Get game analytics from the rollup tables (updated in batches)."""
+    return StatsResponse(
+        most_switched=analytics_service.get_question_stats(db, QuestionStats.switched_count, limit),
+        most_drawn=analytics_service.get_question_stats(db, QuestionStats.drawn_count, limit),
+        popular_custom=analytics_service.get_question_stats(
+            db, QuestionStats.completed_count, limit, custom_only=True
+        ),
+        sessions=analytics_service.get_session_summary(db),
+        recent_sessions=analytics_service.get_recent_sessions(db, limit)
+    )
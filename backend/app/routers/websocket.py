@@ -1,54 +1,201 @@
+import asyncio
+import math
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 import json
-from typing import Dict, Set
+from typing import Dict, Iterable, Iterator, List, Tuple
+from ..config import get_settings
 from ..database import get_db, SessionLocal
 from ..services import room_service, game_service
+from ..services.analytics_service import analytics
+from ..services.prefetch_service import prefetcher
+from ..models import Room, GameHistory
 from ..schemas import PlayerResponse, QuestionResponse
 
 router = APIRouter()
+settings = get_settings()
 
 
-class ConnectionManager:
-    """Manages WebSocket connections per room."""
+class Connection:
+    """One accepted WebSocket in a room.
 
-    def __init__(self):
-        # room_code -> set of (websocket, player_id)
-        self.rooms: Dict[str, Set[tuple]] = {}
+    A player's connections (one per tab) are chained through next_tab, so the
+    player index needs no container per player.
+    """
 
-    async def connect(self, websocket: WebSocket, room_code: str, player_id: str):
-        await websocket.accept()
-        if room_code not in self.rooms:
-            self.rooms[room_code] = set()
-        self.rooms[room_code].add((websocket, player_id))
+    __slots__ = ("websocket", "room_code", "player_id", "next_tab", "missed_heartbeats")
 
-    def disconnect(self, websocket: WebSocket, room_code: str, player_id: str):
-        if room_code in self.rooms:
-            self.rooms[room_code].discard((websocket, player_id))
-            if not self.rooms[room_code]:
-                del self.rooms[room_code]
+    def __init__(self, websocket: WebSocket, room_code: str, player_id: str):
+        self.websocket = websocket
+        self.room_code = room_code
+        self.player_id = player_id
+        self.next_tab: Connection | None = None
+        # Heartbeat visits since anything was received; None once unregistered.
+        # A small int rather than a timestamp, so no object per connection
+        self.missed_heartbeats: int | None = 0
 
-    async def broadcast_to_room(self, room_code: str, message: dict, exclude_player: str = None):
-        if room_code not in self.rooms:
+
+class ConnectionManager:
+    """Manages WebSocket connections per room.
+
+    Member lists are immutable tuples replaced on connect/disconnect, so
+    broadcasts iterate them directly while other coroutines join or leave.
+    Membership changes are rare next to broadcasts, and rooms are small.
+
+    Heartbeats use one timer wheel for all rooms: every connection sits in
+    one of heartbeat_wheel_slots buckets, and each tick visits the next
+    bucket, so every connection is checked once per heartbeat interval.
+    Buckets are plain lists; disconnected entries are dropped lazily when
+    their bucket is visited. A connection is pinged once it has been silent
+    for a visit, and dropped after heartbeat_timeout worth of silent visits.
+    """
+
+    def __init__(
+        self,
+        heartbeat_interval: float = settings.heartbeat_interval_seconds,
+        heartbeat_timeout: float = settings.heartbeat_timeout_seconds,
+        wheel_slots: int = settings.heartbeat_wheel_slots
+    ):
+        # room_code -> connections in the room
+        self.rooms: Dict[str, Tuple[Connection, ...]] = {}
+        # player_id -> first of that player's connections, in any room
+        self.players: Dict[str, Connection] = {}
+
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_limit = math.ceil(heartbeat_timeout / heartbeat_interval)
+        self.wheel: List[List[Connection]] = [[] for _ in range(wheel_slots)]
+        self.wheel_position = 0
+
+    async def connect(self, websocket: WebSocket, room_code: str, player_id: str) -> Connection:
+        await websocket.accept()
+        connection = Connection(websocket, room_code, player_id)
+        self.rooms[room_code] = self.rooms.get(room_code, ()) + (connection,)
+        connection.next_tab = self.players.get(player_id)
+        self.players[player_id] = connection
+
+        # The bucket just visited comes round again one interval from now
+        self.wheel[self.wheel_position - 1].append(connection)
+        return connection
+
+    def disconnect(self, connection: Connection) -> bool:
+        """Unregister a connection. Returns False if it was already gone."""
+        room_code = connection.room_code
+        members = self.rooms.get(room_code, ())
+        if connection not in members:
+            return False
+
+        remaining = tuple(c for c in members if c is not connection)
+        if remaining:
+            self.rooms[room_code] = remaining
+        else:
+            del self.rooms[room_code]
+        # Its bucket drops it on the next visit
+        connection.missed_heartbeats = None
+
+        # Unlink from the player's chain; the removed record keeps its
+        # next_tab so a send walking the chain can still move past it
+        player_id = connection.player_id
+        head = self.players.get(player_id)
+        if head is connection:
+            if connection.next_tab:
+                self.players[player_id] = connection.next_tab
+            else:
+                del self.players[player_id]
+            return True
+        while head is not None and head.next_tab is not connection:
+            head = head.next_tab
+        if head is not None:
+            head.next_tab = connection.next_tab
+        return True
+
+    async def release(self, connection: Connection):
+        """Unregister a connection and tell the room if the player's last tab is gone.
+
+        Every exit path (socket closed, failed send, missed heartbeat) goes
+        through here, and only the first call for a connection notifies.
+        """
+        if not self.disconnect(connection):
             return
-        for ws, pid in self.rooms[room_code].copy():
-            if exclude_player and pid == exclude_player:
+        if not self.is_connected(connection.room_code, connection.player_id):
+            await self.broadcast_to_room(connection.room_code, {
+                "type": "player_disconnected",
+                "player_id": connection.player_id
+            })
+
+    def player_connections(self, room_code: str, player_id: str) -> Iterator[Connection]:
+        connection = self.players.get(player_id)
+        while connection is not None:
+            if connection.room_code == room_code:
+                yield connection
+            connection = connection.next_tab
+
+    def is_connected(self, room_code: str, player_id: str) -> bool:
+        return next(self.player_connections(room_code, player_id), None) is not None
+
+    async def _send(self, connections: Iterable[Connection], message: dict, exclude_player: str = None):
+        failed = None
+        for connection in connections:
+            if exclude_player and connection.player_id == exclude_player:
                 continue
             try:
-                await ws.send_json(message)
+                await connection.websocket.send_json(message)
             except Exception:
-                self.rooms[room_code].discard((ws, pid))
+                failed = (failed or []) + [connection]
+        if failed:
+            for connection in failed:
+                await self.release(connection)
+
+    async def broadcast_to_room(self, room_code: str, message: dict, exclude_player: str = None):
+        await self._send(self.rooms.get(room_code, ()), message, exclude_player)
 
     async def send_to_player(self, room_code: str, player_id: str, message: dict):
-        if room_code not in self.rooms:
+        """Send to every connection (tab) the player has open in the room."""
+        await self._send(self.player_connections(room_code, player_id), message)
+
+    async def run_heartbeat(self):
+        """Advance the timer wheel forever, one bucket per tick."""
+        tick = self.heartbeat_interval / len(self.wheel)
+        while True:
+            await asyncio.sleep(tick)
+            await self.heartbeat_tick()
+
+    async def heartbeat_tick(self):
+        slot = self.wheel_position
+        bucket = self.wheel[slot]
+        self.wheel_position = (slot + 1) % len(self.wheel)
+        if not bucket:
             return
-        for ws, pid in self.rooms[room_code]:
-            if pid == player_id:
-                try:
-                    await ws.send_json(message)
-                except Exception:
-                    pass
-                break
+
+        live = []
+        expired = []
+        idle = []
+        for connection in bucket:
+            missed = connection.missed_heartbeats
+            if missed is None:
+                # Disconnected since the last visit
+                continue
+            if missed >= self.heartbeat_limit:
+                expired.append(connection)
+                continue
+            live.append(connection)
+            if missed:
+                # Connections heard from since the last visit don't need a ping
+                idle.append(connection)
+            connection.missed_heartbeats = missed + 1
+
+        # Compact before awaiting; connections accepted meanwhile join this slot
+        self.wheel[slot] = live
+
+        for connection in expired:
+            await self.release(connection)
+            try:
+                await connection.websocket.close(code=1001, reason="Heartbeat timeout")
+            except Exception:
+                pass
+
+        await self._send(idle, {"type": "ping"})
 
 
 manager = ConnectionManager()
@@ -62,50 +209,202 @@ def get_db_session():
         pass
 
 
+ROOM_CONFLICT_RETRIES = 3
+
+
+def draw_next_card(
+    db: Session,
+    room: Room,
+    room_code: str,
+    broadcasts: list[dict]
+) -> tuple[dict | None, str | None]:
+    """Draw the room's next card, preferring its prefetched reservation.
+
+    Returns the card and the key of the prefetched entry it came from. The
+    entry is only consumed after the draw committed, so a StaleDataError
+    retry draws the same reservation again.
+    """
+    entry = prefetcher.peek(room_code)
+    if entry:
+        try:
+            game_service.draw_reserved_card(db, room, entry["card"]["id"])
+        except IntegrityError:
+            # The reserved question was deleted; revoke it. The rollback
+            # expired the room, so retry the whole command on fresh state
+            # rather than drawing again without the version check
+            db.rollback()
+            revoked = prefetcher.release_question(room_code, entry["card"]["id"])
+            broadcasts.append({"type": "prefetch_revoked", "keys": revoked})
+            raise StaleDataError("Reserved question was deleted")
+        prefetcher.consume(room_code, entry["key"])
+        return entry["card"], entry["key"]
+
+    # Only reached with no reservations left, so this never picks a reserved card
+    card = game_service.draw_card(db, room)
+    if not card:
+        return None, None
+    prefetcher.note_drawn(room_code, card.id)
+    return game_service.card_to_dict(card), None
+
+
+async def revoke_prefetched_question(room_code: str, question_id: int):
+    """Drop a deleted question's reservations and tell the room.
+
+    Reservations are only touched from the event loop; sync routes call this
+    through anyio.from_thread.run.
+    """
+    revoked = prefetcher.release_question(room_code, question_id)
+    if revoked:
+        await manager.broadcast_to_room(room_code, {
+            "type": "prefetch_revoked",
+            "keys": revoked
+        })
+
+
+def refill_prefetch(room_code: str, room_id: int):
+    async def push(entries: list[dict]):
+        await manager.broadcast_to_room(room_code, {
+            "type": "cards_prefetched",
+            "cards": entries
+        })
+
+    prefetcher.schedule_refill(room_code, room_id, push)
+
+
+def handle_command(
+    db: Session,
+    room: Room,
+    room_code: str,
+    player_id: str,
+    message_type: str,
+    broadcasts: list[dict]
+) -> str | None:
+    """Apply a client command and queue its result for the room in broadcasts.
+
+    Returns an error message for the sender, if any. Raises StaleDataError
+    if the room changed concurrently. Nothing is awaited here, so the caller
+    can end the session before sending anything.
+    """
+    if message_type == "start_game":
+        # Only host can start
+        if room.host_id != player_id:
+            return "Only the host can start the game"
+
+        room_service.update_room_status(db, room, "playing")
+        analytics.record_game_started(room_code)
+        broadcasts.append({
+            "type": "game_started",
+            "status": "playing"
+        })
+        prefetcher.activate(room_code)
+        refill_prefetch(room_code, room.id)
+
+    elif message_type in ("draw_card", "switch_card"):
+        if room.status != "playing":
+            return "Game is not in progress"
+
+        previous_card_id = room.current_card_id
+        card, prefetch_key = draw_next_card(db, room, room_code, broadcasts)
+        if not card:
+            return "No cards available"
+
+        if message_type == "draw_card":
+            analytics.record_card_drawn(room_code, previous_card_id, card["id"])
+            event = {"type": "card_drawn", "drawn_by": player_id}
+        else:
+            analytics.record_card_switched(room_code, previous_card_id, card["id"])
+            event = {"type": "card_switched", "switched_by": player_id}
+
+        # Clients holding the prefetched entry can show it by key alone
+        event["prefetched"] = prefetch_key
+        event["card"] = card
+        broadcasts.append(event)
+        refill_prefetch(room_code, room.id)
+
+    elif message_type == "end_game":
+        # Only host can end
+        if room.host_id != player_id:
+            return "Only the host can end the game"
+
+        current_card_id = room.current_card_id
+        room_service.update_room_status(db, room, "ended")
+        analytics.record_game_ended(room_code, current_card_id)
+        prefetcher.discard(room_code)
+        broadcasts.append({
+            "type": "game_ended",
+            "status": "ended"
+        })
+
+    elif message_type == "restart_game":
+        # Only host can restart
+        if room.host_id != player_id:
+            return "Only the host can restart the game"
+
+        # Clear history and reset status in one compare-and-set commit
+        db.query(GameHistory).filter(GameHistory.room_id == room.id).delete()
+        room.current_card_id = None
+        room_service.update_room_status(db, room, "waiting")
+        analytics.record_game_ended(room_code, None)
+        prefetcher.discard(room_code)
+
+        broadcasts.append({
+            "type": "game_restarted",
+            "status": "waiting"
+        })
+
+    return None
+
+
 @router.websocket("/ws/{room_code}/{player_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
     room_code: str,
     player_id: str
 ):
-    db = SessionLocal()
+    connection = None
 
     try:
-        # Verify room exists
-        room = room_service.get_room_by_code(db, room_code)
-        if not room:
-            await websocket.close(code=4004, reason="Room not found")
-            return
-
-        await manager.connect(websocket, room_code, player_id)
+        # Sessions live for one step (initial load, then one per message) so
+        # idle sockets hold no pooled connection; expire_on_commit=False keeps
+        # the room's columns usable after its session closes
+        with SessionLocal(expire_on_commit=False) as db:
+            # Verify room exists
+            room = room_service.get_room_by_code(db, room_code)
+            if not room:
+                await websocket.close(code=4004, reason="Room not found")
+                return
+
+            players_data = [
+                {
+                    "id": p.id,
+                    "player_id": p.player_id,
+                    "nickname": p.nickname,
+                    "is_host": p.is_host,
+                    "joined_at": p.joined_at.isoformat()
+                }
+                for p in room.players
+            ]
+
+            current_card_data = None
+            if room.current_card:
+                current_card_data = game_service.card_to_dict(room.current_card)
+
+            # Only the room's own columns are carried between messages
+            db.expire(room, ["players", "current_card", "history"])
+
+        connection = await manager.connect(websocket, room_code, player_id)
+
+        if room.status == "playing":
+            prefetcher.activate(room_code)
+            refill_prefetch(room_code, room.id)
 
         # Send current game state to the joining player
-        players_data = [
-            {
-                "id": p.id,
-                "player_id": p.player_id,
-                "nickname": p.nickname,
-                "is_host": p.is_host,
-                "joined_at": p.joined_at.isoformat()
-            }
-            for p in room.players
-        ]
-
-        current_card_data = None
-        if room.current_card:
-            current_card_data = {
-                "id": room.current_card.id,
-                "content": room.current_card.content,
-                "is_system": room.current_card.is_system,
-                "created_by": room.current_card.created_by,
-                "created_at": room.current_card.created_at.isoformat()
-            }
-
         await websocket.send_json({
             "type": "game_state",
             "status": room.status,
             "current_card": current_card_data,
-            "players": players_data
+            "players": players_data,
+            "prefetched": prefetcher.entries(room_code)
         })
 
         # Notify others that a player connected
@@ -114,132 +413,72 @@ async def websocket_endpoint(
             {
                 "type": "player_connected",
                 "player_id": player_id,
-                "player_count": len(room.players)
+                "player_count": len(players_data)
             },
             exclude_player=player_id
         )
 
         while True:
             data = await websocket.receive_json()
+            if connection.missed_heartbeats is not None:
+                connection.missed_heartbeats = 0
             message_type = data.get("type")
 
-            db.refresh(room)  # Refresh room state
-
-            if message_type == "start_game":
-                # Only host can start
-                if room.host_id != player_id:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Only the host can start the game"
-                    })
-                    continue
-
-                room = room_service.update_room_status(db, room, "playing")
-                await manager.broadcast_to_room(room_code, {
-                    "type": "game_started",
-                    "status": "playing"
-                })
-
-            elif message_type == "draw_card":
-                if room.status != "playing":
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Game is not in progress"
-                    })
-                    continue
-
-                card = game_service.draw_card(db, room)
-                if card:
-                    card_data = {
-                        "id": card.id,
-                        "content": card.content,
-                        "is_system": card.is_system,
-                        "created_by": card.created_by,
-                        "created_at": card.created_at.isoformat()
-                    }
-                    await manager.broadcast_to_room(room_code, {
-                        "type": "card_drawn",
-                        "card": card_data,
-                        "drawn_by": player_id
-                    })
+            if message_type == "pong":
+                continue
+
+            broadcasts = []
+            reply = None
+            with SessionLocal(expire_on_commit=False) as db:
+                # Re-attach the cached room without a SELECT; its version
+                # still guards every write
+                room = db.merge(room, load=False)
+
+                # Commands run against the cached room; writes are compare-and-set
+                # on room.version, so a concurrent change is retried on fresh state
+                fresh = False
+                for _ in range(ROOM_CONFLICT_RETRIES):
+                    try:
+                        error = handle_command(db, room, room_code, player_id, message_type, broadcasts)
+                    except StaleDataError:
+                        db.rollback()
+                        fresh = True
+                        continue
+
+                    if error and not fresh:
+                        # Rejections were decided on cached state; confirm them
+                        # against the latest row before replying
+                        db.expire(room)
+                        fresh = True
+                        continue
+
+                    if error:
+                        reply = {"type": "error", "message": error}
+                    break
                 else:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "No cards available"
-                    })
-
-            elif message_type == "switch_card":
-                if room.status != "playing":
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Game is not in progress"
-                    })
-                    continue
-
-                card = game_service.switch_card(db, room)
-                if card:
-                    card_data = {
-                        "id": card.id,
-                        "content": card.content,
-                        "is_system": card.is_system,
-                        "created_by": card.created_by,
-                        "created_at": card.created_at.isoformat()
+                    reply = {
+                        "type": "conflict",
+                        "message": "Room was updated by another player, please try again"
                     }
-                    await manager.broadcast_to_room(room_code, {
-                        "type": "card_switched",
-                        "card": card_data,
-                        "switched_by": player_id
-                    })
-                else:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "No cards available"
-                    })
-
-            elif message_type == "end_game":
-                # Only host can end
-                if room.host_id != player_id:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Only the host can end the game"
-                    })
-                    continue
-
-                room = room_service.update_room_status(db, room, "ended")
-                await manager.broadcast_to_room(room_code, {
-                    "type": "game_ended",
-                    "status": "ended"
-                })
-
-            elif message_type == "restart_game":
-                # Only host can restart
-                if room.host_id != player_id:
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Only the host can restart the game"
-                    })
-                    continue
-
-                # Clear history and reset status
-                from ..models import GameHistory
-                db.query(GameHistory).filter(GameHistory.room_id == room.id).delete()
-                room.current_card_id = None
-                room = room_service.update_room_status(db, room, "waiting")
-
-                await manager.broadcast_to_room(room_code, {
-                    "type": "game_restarted",
-                    "status": "waiting"
-                })
+
+            # The session is closed (any open transaction rolled back and its
+            # connection back in the pool) before sending, so slow clients
+            # never hold a pooled connection
+            for message in broadcasts:
+                await manager.broadcast_to_room(room_code, message)
+            if reply:
+                await websocket.send_json(reply)
 
     except WebSocketDisconnect:
-        manager.disconnect(websocket, room_code, player_id)
-        # Notify others
-        await manager.broadcast_to_room(room_code, {
-            "type": "player_disconnected",
-            "player_id": player_id
-        })
+        # Notify others (unless a heartbeat or failed send already did)
+        if connection:
+            await manager.release(connection)
     except Exception as e:
-        manager.disconnect(websocket, room_code, player_id)
+        if connection:
+            await manager.release(connection)
         print(f"WebSocket error: {e}")
     finally:
-        db.close()
+        # Nobody left to push reservations to or to play the session
+        if room_code not in manager.rooms:
+            prefetcher.discard(room_code)
+            analytics.record_room_closed(room_code)
@@ -71,6 +71,42 @@ class RoomBasicResponse(BaseModel):
     player_count: int
 
 
+# Stats schemas
+class QuestionStatsResponse(BaseModel):
+    question_id: int
+    content: str
+    is_system: bool
+    created_by: Optional[str]
+    drawn_count: int
+    switched_count: int
+    completed_count: int
+
+
+class RoomSessionResponse(BaseModel):
+    room_code: str
+    started_at: datetime
+    ended_at: Optional[datetime]
+    cards_drawn: int
+    cards_switched: int
+
+    class Config:
+        from_attributes = True
+
+
+class SessionSummaryResponse(BaseModel):
+    total_sessions: int
+    avg_cards_drawn: float
+    avg_cards_switched: float
+
+
+class StatsResponse(BaseModel):
+    most_switched: List[QuestionStatsResponse]
+    most_drawn: List[QuestionStatsResponse]
+    popular_custom: List[QuestionStatsResponse]
+    sessions: SessionSummaryResponse
+    recent_sessions: List[RoomSessionResponse]
+
+
 # WebSocket message schemas
 class WSMessage(BaseModel):
     type: str
@@ -0,0 +1,259 @@
+import asyncio
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from ..database import SessionLocal, insert
+from ..models import Question, QuestionStats, RoomSession
+
+FLUSH_INTERVAL_SECONDS = 10
+FLUSH_BATCH_SIZE = 200
+
+
+@dataclass
+class SessionTally:
+    """Running summary of one room session, holding deltas not yet flushed."""
+    room_code: str
+    started_at: datetime
+    session_id: int | None = None
+    cards_drawn: int = 0
+    cards_switched: int = 0
+    ended_at: datetime | None = None
+    dirty: bool = True
+
+
+class AnalyticsBuffer:
+    """Collects game events in memory and flushes them as rollups in batches.
+
+    Events are recorded from the event loop; flush() runs in a worker thread,
+    so the buffers are swapped under a lock and written outside it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._question_counts: dict[int, Counter] = {}
+        self._open_sessions: dict[str, SessionTally] = {}
+        self._closed_sessions: list[SessionTally] = []
+        self._pending = 0
+        self._wakeup: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _count(self, question_id: int | None, field: str):
+        if question_id is None:
+            return
+        self._question_counts.setdefault(question_id, Counter())[field] += 1
+        self._pending += 1
+
+    def _session(self, room_code: str) -> SessionTally:
+        tally = self._open_sessions.get(room_code)
+        if tally is None:
+            # Rooms that were already playing when the server started
+            tally = SessionTally(room_code=room_code, started_at=datetime.now(timezone.utc))
+            self._open_sessions[room_code] = tally
+        return tally
+
+    def _notify(self):
+        # Events may be recorded from threadpool routes, and asyncio.Event is
+        # not thread-safe, so the flusher's loop sets it
+        if self._pending >= FLUSH_BATCH_SIZE and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def record_game_started(self, room_code: str):
+        with self._lock:
+            self._close_session(room_code)
+            self._open_sessions[room_code] = SessionTally(
+                room_code=room_code,
+                started_at=datetime.now(timezone.utc)
+            )
+            self._pending += 1
+        self._notify()
+
+    def record_game_ended(self, room_code: str, current_card_id: int | None):
+        with self._lock:
+            self._count(current_card_id, "completed")
+            self._close_session(room_code)
+            self._pending += 1
+        self._notify()
+
+    def record_room_closed(self, room_code: str):
+        """End the open session of a room that was deleted or lost its last connection."""
+        with self._lock:
+            if room_code not in self._open_sessions:
+                return
+            self._close_session(room_code)
+            self._pending += 1
+        self._notify()
+
+    def record_card_drawn(self, room_code: str, previous_card_id: int | None, card_id: int):
+        """A draw moves past the previous card, which counts as completed."""
+        with self._lock:
+            self._count(previous_card_id, "completed")
+            self._count(card_id, "drawn")
+            tally = self._session(room_code)
+            tally.cards_drawn += 1
+            tally.dirty = True
+        self._notify()
+
+    def record_card_switched(self, room_code: str, previous_card_id: int | None, card_id: int):
+        with self._lock:
+            self._count(previous_card_id, "switched")
+            self._count(card_id, "drawn")
+            tally = self._session(room_code)
+            tally.cards_switched += 1
+            tally.dirty = True
+        self._notify()
+
+    def _close_session(self, room_code: str):
+        tally = self._open_sessions.pop(room_code, None)
+        if tally is not None:
+            tally.ended_at = datetime.now(timezone.utc)
+            tally.dirty = True
+            self._closed_sessions.append(tally)
+
+    def flush(self):
+        """Write buffered counters to the rollup tables in one transaction."""
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            counts, self._question_counts = self._question_counts, {}
+            closed, self._closed_sessions = self._closed_sessions, []
+            batch = []
+            for tally in [*self._open_sessions.values(), *closed]:
+                if tally.dirty:
+                    batch.append((tally, tally.cards_drawn, tally.cards_switched, tally.ended_at))
+                    tally.cards_drawn = tally.cards_switched = 0
+                    tally.dirty = False
+            self._pending = 0
+
+        if not counts and not batch:
+            return
+
+        db = SessionLocal()
+        new_ids = []
+        try:
+            if counts:
+                stmt = insert(QuestionStats).values([
+                    {
+                        "question_id": question_id,
+                        "drawn_count": counter["drawn"],
+                        "switched_count": counter["switched"],
+                        "completed_count": counter["completed"]
+                    }
+                    for question_id, counter in counts.items()
+                ])
+                db.execute(stmt.on_conflict_do_update(
+                    index_elements=["question_id"],
+                    set_={
+                        "drawn_count": QuestionStats.drawn_count + stmt.excluded.drawn_count,
+                        "switched_count": QuestionStats.switched_count + stmt.excluded.switched_count,
+                        "completed_count": QuestionStats.completed_count + stmt.excluded.completed_count
+                    }
+                ))
+
+            for tally, drawn, switched, ended_at in batch:
+                if tally.session_id is None:
+                    session_id = db.execute(insert(RoomSession).values(
+                        room_code=tally.room_code,
+                        started_at=tally.started_at,
+                        ended_at=ended_at,
+                        cards_drawn=drawn,
+                        cards_switched=switched
+                    ).returning(RoomSession.id)).scalar_one()
+                    new_ids.append((tally, session_id))
+                else:
+                    db.execute(update(RoomSession).where(
+                        RoomSession.id == tally.session_id
+                    ).values(
+                        ended_at=ended_at,
+                        cards_drawn=RoomSession.cards_drawn + drawn,
+                        cards_switched=RoomSession.cards_switched + switched
+                    ))
+
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Analytics flush failed: {e}")
+            self._restore(counts, batch)
+            return
+        finally:
+            db.close()
+
+        for tally, session_id in new_ids:
+            tally.session_id = session_id
+
+    def _restore(self, counts: dict[int, Counter], batch: list):
+        """Put a failed flush back so the next one retries it."""
+        with self._lock:
+            for question_id, counter in counts.items():
+                self._question_counts.setdefault(question_id, Counter()).update(counter)
+            for tally, drawn, switched, ended_at in batch:
+                tally.cards_drawn += drawn
+                tally.cards_switched += switched
+                tally.dirty = True
+                if ended_at is not None:
+                    self._closed_sessions.append(tally)
+            self._pending += len(counts) + len(batch)
+
+    async def run_flusher(self):
+        """Flush every FLUSH_INTERVAL_SECONDS, or sooner once a batch fills up."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), FLUSH_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await asyncio.to_thread(self.flush)
+        finally:
+            # Nothing to wake once the loop stops
+            self._wakeup = None
+
+
+analytics = AnalyticsBuffer()
+
+
+def get_question_stats(db: Session, order_by, limit: int, custom_only: bool = False) -> list[dict]:
+    """Get per-question counters joined with question content."""
+    query = db.query(
+        QuestionStats.question_id,
+        Question.content,
+        Question.is_system,
+        Question.created_by,
+        QuestionStats.drawn_count,
+        QuestionStats.switched_count,
+        QuestionStats.completed_count
+    ).join(Question, Question.id == QuestionStats.question_id)
+
+    if custom_only:
+        query = query.filter(Question.is_system == False)
+
+    rows = query.order_by(order_by.desc(), QuestionStats.question_id).limit(limit).all()
+    return [row._asdict() for row in rows]
+
+
+def get_session_summary(db: Session) -> dict:
+    """Get totals and averages over all recorded room sessions."""
+    total, avg_drawn, avg_switched = db.query(
+        func.count(RoomSession.id),
+        func.avg(RoomSession.cards_drawn),
+        func.avg(RoomSession.cards_switched)
+    ).one()
+    return {
+        "total_sessions": total,
+        "avg_cards_drawn": float(avg_drawn or 0),
+        "avg_cards_switched": float(avg_switched or 0)
+    }
+
+
+def get_recent_sessions(db: Session, limit: int) -> list[RoomSession]:
+    """Get the most recently started room sessions."""
+    return db.query(RoomSession).order_by(
+        RoomSession.started_at.desc()
+    ).limit(limit).all()
@@ -0,0 +1,156 @@
+import zlib
+from datetime import datetime, timezone
+from typing import BinaryIO, Iterable, Iterator
+import orjson
+from sqlalchemy import select, insert
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models import Room, Question, GameHistory
+
+EXPORT_BATCH_SIZE = 1000
+IMPORT_BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+# wbits for zlib streams in a gzip container
+GZIP_WBITS = 31
+
+
+def iter_room_export(db: Session, room_code: str) -> Iterator[dict]:
+    """Yield a room's export records: a header, played history, then custom deck.
+
+    Rows are read with yield_per, which uses a server-side cursor, so memory
+    stays constant however long the room has been played.
+    """
+    room = db.query(Room).filter(Room.room_code == room_code.upper()).first()
+    if not room:
+        return
+
+    yield {
+        "type": "room",
+        "room_code": room.room_code,
+        "status": room.status,
+        "created_at": room.created_at,
+        "exported_at": datetime.now(timezone.utc)
+    }
+
+    history = db.execute(
+        select(
+            GameHistory.drawn_at,
+            Question.id,
+            Question.content,
+            Question.is_system
+        ).join(
+            Question, Question.id == GameHistory.question_id
+        ).where(
+            GameHistory.room_id == room.id
+        ).order_by(GameHistory.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    for row in history:
+        yield {
+            "type": "history",
+            "question_id": row.id,
+            "content": row.content,
+            "is_system": row.is_system,
+            "drawn_at": row.drawn_at
+        }
+
+    deck = db.execute(
+        select(Question.content, Question.created_at).where(
+            Question.created_by == room.room_code,
+            Question.is_system == False
+        ).order_by(Question.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    for row in deck:
+        yield {
+            "type": "question",
+            "content": row.content,
+            "created_at": row.created_at
+        }
+
+
+def encode_ndjson(records: Iterable[dict], compress: bool = False) -> Iterator[bytes]:
+    """Encode records as NDJSON in chunks of about CHUNK_SIZE, optionally gzipped."""
+    compressor = zlib.compressobj(wbits=GZIP_WBITS) if compress else None
+    buffer = bytearray()
+
+    for record in records:
+        buffer += orjson.dumps(record, option=orjson.OPT_UTC_Z)
+        buffer += b"\n"
+        if len(buffer) >= CHUNK_SIZE:
+            chunk = compressor.compress(buffer) if compressor else bytes(buffer)
+            buffer.clear()
+            if chunk:
+                yield chunk
+
+    tail = compressor.compress(buffer) + compressor.flush() if compressor else bytes(buffer)
+    if tail:
+        yield tail
+
+
+def stream_room_export(room_code: str, compress: bool = False) -> Iterator[bytes]:
+    """Stream a room export with its own session, closed when the stream ends.
+
+    StreamingResponse consumes this after the request's dependencies have
+    finished, so it cannot use the request session.
+    """
+    with SessionLocal() as db:
+        yield from encode_ndjson(iter_room_export(db, room_code), compress)
+
+
+def iter_ndjson(stream: BinaryIO) -> Iterator[dict]:
+    """Parse NDJSON records from a binary stream, gunzipping it if needed."""
+    decompressor = None
+    pending = b""
+    first = True
+
+    while chunk := stream.read(CHUNK_SIZE):
+        if first:
+            if chunk[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(wbits=GZIP_WBITS)
+            first = False
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield orjson.loads(line)
+
+    if decompressor:
+        pending += decompressor.flush()
+    for line in pending.split(b"\n"):
+        if line.strip():
+            yield orjson.loads(line)
+
+
+def import_custom_questions(db: Session, room_code: str, records: Iterable[dict]) -> int:
+    """Bulk insert the deck ("question" records) of an export into a room.
+
+    Inserts in batches of IMPORT_BATCH_SIZE and commits once, so a failed
+    import leaves the deck unchanged. Returns the number of questions added.
+    Raises ValueError on records that are not objects or questions without
+    text content.
+    """
+    imported = 0
+    batch = []
+
+    for record in records:
+        if not isinstance(record, dict):
+            raise ValueError("Export records must be JSON objects")
+        if record.get("type") != "question":
+            continue
+        content = record.get("content")
+        if not isinstance(content, str) or not content.strip():
+            raise ValueError("Question records need non-empty text content")
+        batch.append({"content": content, "is_system": False, "created_by": room_code})
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            db.execute(insert(Question), batch)
+            imported += len(batch)
+            batch = []
+
+    if batch:
+        db.execute(insert(Question), batch)
+        imported += len(batch)
+
+    db.commit()
+    return imported
@@ -1,8 +1,17 @@
 import random
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy import or_, select
 from ..models import Room, Question, GameHistory
 
+# QuestionResponse fields in schema order, selected directly for the list endpoints
+QUESTION_COLUMNS = (
+    Question.content,
+    Question.id,
+    Question.is_system,
+    Question.created_by,
+    Question.created_at
+)
+
 
 def get_available_questions(db: Session, room: Room) -> list[Question]:
     """Get all available questions for a room (system + room's custom)."""
@@ -27,13 +36,17 @@ def get_available_questions(db: Session, room: Room) -> list[Question]:
 
 
 def draw_card(db: Session, room: Room) -> Question | None:
-    """Draw a random card for the room."""
+    """Draw a random card for the room.
+
+    History and current card are committed together with a compare-and-set on
+    room.version; raises StaleDataError (after nothing was written) if the
+    room changed since it was loaded.
+    """
     available = get_available_questions(db, room)
 
     if not available:
-        # Reset history if all cards drawn
+        # Reset history if all cards drawn, in the same transaction as the draw
         db.query(GameHistory).filter(GameHistory.room_id == room.id).delete()
-        db.commit()
         available = get_available_questions(db, room)
 
     if not available:
@@ -53,6 +66,55 @@ def draw_card(db: Session, room: Room) -> Question | None:
     return card
 
 
+def draw_reserved_card(db: Session, room: Room, question_id: int):
+    """Record a card reserved ahead of time as the room's next draw.
+
+    Skips the history query and question scan of draw_card: only the history
+    row and the current card are committed, with the same compare-and-set on
+    room.version. Raises IntegrityError if the question has been deleted.
+    """
+    db.add(GameHistory(room_id=room.id, question_id=question_id))
+    room.current_card_id = question_id
+    db.commit()
+
+
+def reserve_cards(db: Session, room_id: int, room_code: str, exclude_ids: list[int], count: int) -> list[dict]:
+    """Pick up to count random undrawn cards for a room, skipping exclude_ids.
+
+    Returns card dicts in draw order.
+    """
+    drawn_ids = select(GameHistory.question_id).where(GameHistory.room_id == room_id)
+    query = select(Question.id).where(
+        or_(
+            Question.is_system == True,
+            Question.created_by == room_code
+        ),
+        Question.id.notin_(drawn_ids)
+    )
+    if exclude_ids:
+        query = query.where(Question.id.notin_(exclude_ids))
+
+    ids = db.execute(query).scalars().all()
+    chosen = random.sample(ids, min(count, len(ids)))
+    if not chosen:
+        return []
+
+    rows = db.execute(select(*QUESTION_COLUMNS).where(Question.id.in_(chosen))).all()
+    by_id = {row.id: row for row in rows}
+    return [card_to_dict(by_id[question_id]) for question_id in chosen if question_id in by_id]
+
+
+def card_to_dict(card: Question) -> dict:
+    """Serialize a question (or a row of QUESTION_COLUMNS) for WebSocket messages."""
+    return {
+        "id": card.id,
+        "content": card.content,
+        "is_system": card.is_system,
+        "created_by": card.created_by,
+        "created_at": card.created_at.isoformat()
+    }
+
+
 def switch_card(db: Session, room: Room) -> Question | None:
     """Switch the current card for a new one."""
     return draw_card(db, room)
@@ -71,21 +133,33 @@ def add_custom_question(db: Session, content: str, room_code: str) -> Question:
     return question
 
 
-def get_room_questions(db: Session, room_code: str) -> list[Question]:
+def get_question_rows(db: Session, *criteria) -> list[dict]:
+    """Get questions as plain dicts from selected columns, skipping ORM hydration."""
+    rows = db.execute(
+        select(*QUESTION_COLUMNS).where(*criteria).order_by(Question.id)
+    ).all()
+    return [row._asdict() for row in rows]
+
+
+def get_system_questions(db: Session) -> list[dict]:
+    """Get all system questions."""
+    return get_question_rows(db, Question.is_system == True)
+
+
+def get_room_questions(db: Session, room_code: str) -> list[dict]:
     """Get all questions available for a room."""
-    return db.query(Question).filter(
+    return get_question_rows(
+        db,
         or_(
             Question.is_system == True,
             Question.created_by == room_code
         )
-    ).all()
+    )
 
 
-def get_custom_questions(db: Session, room_code: str) -> list[Question]:
+def get_custom_questions(db: Session, room_code: str) -> list[dict]:
     """Get only custom questions for a room."""
-    return db.query(Question).filter(
-        Question.created_by == room_code
-    ).all()
+    return get_question_rows(db, Question.created_by == room_code)
 
 
 def delete_custom_question(db: Session, question_id: int, room_code: str) -> bool:
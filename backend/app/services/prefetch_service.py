@@ -0,0 +1,123 @@
+import asyncio
+import secrets
+from collections import deque
+from typing import Awaitable, Callable
+from ..config import get_settings
+from ..database import SessionLocal
+from . import game_service
+
+settings = get_settings()
+
+
+class CardPrefetcher:
+    """Reserves the next cards of each playing room so draws skip the question scan.
+
+    Reserved cards are pushed to clients ahead of time as entries with an
+    opaque key; a draw or switch then commits the head of the queue and only
+    announces its key. Like ConnectionManager, reservations live in this
+    process and are rebuilt from the database when missing.
+    """
+
+    def __init__(self, depth: int = settings.card_prefetch_depth):
+        self.depth = depth
+        # room_code -> reserved {"key", "card"} entries in draw order
+        self.rooms: dict[str, deque] = {}
+        # room_code -> cards drawn outside the queue while a refill is running
+        self._refilling: dict[str, set[int]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def activate(self, room_code: str):
+        self.rooms.setdefault(room_code, deque())
+
+    def discard(self, room_code: str):
+        self.rooms.pop(room_code, None)
+
+    def entries(self, room_code: str) -> list[dict]:
+        return list(self.rooms.get(room_code, ()))
+
+    def peek(self, room_code: str) -> dict | None:
+        queue = self.rooms.get(room_code)
+        return queue[0] if queue else None
+
+    def consume(self, room_code: str, key: str):
+        """Drop the head entry once its draw has been committed."""
+        queue = self.rooms.get(room_code)
+        if queue and queue[0]["key"] == key:
+            queue.popleft()
+
+    def note_drawn(self, room_code: str, question_id: int):
+        """Record a draw that bypassed the queue so a running refill skips it."""
+        drawn = self._refilling.get(room_code)
+        if drawn is not None:
+            drawn.add(question_id)
+
+    def release_question(self, room_code: str, question_id: int) -> list[str]:
+        """Drop reservations of a deleted question. Returns the revoked keys."""
+        queue = self.rooms.get(room_code)
+        if not queue:
+            return []
+        revoked = [entry["key"] for entry in queue if entry["card"]["id"] == question_id]
+        if revoked:
+            # Filter in place so an in-flight refill still sees the same queue
+            remaining = [entry for entry in queue if entry["card"]["id"] != question_id]
+            queue.clear()
+            queue.extend(remaining)
+        return revoked
+
+    def schedule_refill(
+        self,
+        room_code: str,
+        room_id: int,
+        on_refill: Callable[[list[dict]], Awaitable[None]]
+    ):
+        """Top the room's reservations up to depth in the background."""
+        queue = self.rooms.get(room_code)
+        if queue is None or len(queue) >= self.depth or room_code in self._refilling:
+            return
+        self._refilling[room_code] = set()
+        task = asyncio.create_task(self._refill(room_code, room_id, on_refill))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refill(
+        self,
+        room_code: str,
+        room_id: int,
+        on_refill: Callable[[list[dict]], Awaitable[None]]
+    ):
+        drawn_meanwhile = self._refilling[room_code]
+        try:
+            queue = self.rooms.get(room_code)
+            if queue is None:
+                return
+            reserved_ids = [entry["card"]["id"] for entry in queue]
+            cards = await asyncio.to_thread(
+                self._reserve, room_id, room_code, reserved_ids, self.depth - len(reserved_ids)
+            )
+        except Exception as e:
+            print(f"Card prefetch failed for {room_code}: {e}")
+            return
+        finally:
+            del self._refilling[room_code]
+
+        # The room may have ended (or restarted) while the query ran
+        if self.rooms.get(room_code) is not queue:
+            return
+
+        reserved_ids = {entry["card"]["id"] for entry in queue} | drawn_meanwhile
+        added = [
+            {"key": secrets.token_urlsafe(8), "card": card}
+            for card in cards
+            if card["id"] not in reserved_ids
+        ]
+        if added:
+            queue.extend(added)
+            await on_refill(added)
+
+    @staticmethod
+    def _reserve(room_id: int, room_code: str, exclude_ids: list[int], count: int) -> list[dict]:
+        with SessionLocal() as db:
+            return game_service.reserve_cards(db, room_id, room_code, exclude_ids, count)
+
+
+prefetcher = CardPrefetcher()
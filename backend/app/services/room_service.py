@@ -1,7 +1,9 @@
 import random
 import string
+from sqlalchemy import select, literal, false, text, delete, update
 from sqlalchemy.orm import Session
-from ..models import Room, Player
+from ..database import is_sqlite, insert
+from ..models import Room, Player, Question
 from ..schemas import RoomCreate, RoomJoin
 
 
@@ -48,63 +50,213 @@ def get_room_by_code(db: Session, room_code: str) -> Room | None:
     return db.query(Room).filter(Room.room_code == room_code.upper()).first()
 
 
-def join_room(db: Session, room: Room, join_data: RoomJoin) -> Player:
-    """Add a player to an existing room."""
-    # Check if player already in room
-    existing_player = db.query(Player).filter(
-        Player.room_id == room.id,
-        Player.player_id == join_data.player_id
+def get_room_payload(db: Session, room_code: str) -> dict | None:
+    """Get a room in RoomResponse shape from selected columns.
+
+    Builds plain dicts (room with current card, then players) instead of
+    hydrating ORM objects for response_model to re-validate.
+    """
+    row = db.execute(
+        select(
+            Room.id,
+            Room.room_code,
+            Room.host_id,
+            Room.status,
+            Room.created_at,
+            Question.id.label("card_id"),
+            Question.content.label("card_content"),
+            Question.is_system.label("card_is_system"),
+            Question.created_by.label("card_created_by"),
+            Question.created_at.label("card_created_at")
+        ).outerjoin(
+            Question, Question.id == Room.current_card_id
+        ).where(Room.room_code == room_code.upper())
     ).first()
 
-    if existing_player:
-        return existing_player
+    if not row:
+        return None
 
-    player = Player(
-        room_id=room.id,
-        player_id=join_data.player_id,
-        nickname=join_data.nickname,
-        is_host=False
+    players = db.execute(
+        select(
+            Player.nickname,
+            Player.player_id,
+            Player.id,
+            Player.is_host,
+            Player.joined_at
+        ).where(Player.room_id == row.id).order_by(Player.id)
+    ).all()
+
+    current_card = None
+    if row.card_id is not None:
+        current_card = {
+            "content": row.card_content,
+            "id": row.card_id,
+            "is_system": row.card_is_system,
+            "created_by": row.card_created_by,
+            "created_at": row.card_created_at
+        }
+
+    return {
+        "id": row.id,
+        "room_code": row.room_code,
+        "host_id": row.host_id,
+        "status": row.status,
+        "current_card": current_card,
+        "players": [player._asdict() for player in players],
+        "created_at": row.created_at
+    }
+
+
+def join_room(db: Session, room_code: str, join_data: RoomJoin) -> bool:
+    """Add a player to a room. Returns True if a new player was inserted.
+
+    The room is resolved inside the INSERT, so missing or ended rooms insert
+    nothing, and concurrent joins with the same player_id collapse onto the
+    unique (room_id, player_id) constraint instead of creating duplicates.
+    """
+    source = select(
+        Room.id,
+        literal(join_data.player_id),
+        literal(join_data.nickname),
+        false()
+    ).where(
+        Room.room_code == room_code.upper(),
+        Room.status != "ended"
     )
-    db.add(player)
+    stmt = insert(Player).from_select(
+        ["room_id", "player_id", "nickname", "is_host"], source
+    ).on_conflict_do_nothing(
+        index_elements=["room_id", "player_id"]
+    ).returning(Player.id)
+
+    inserted = db.execute(stmt).first()
     db.commit()
-    db.refresh(player)
+    return inserted is not None
 
-    return player
 
+# Deletes the player, promotes the earliest remaining player if the host left,
+# and deletes the room once nobody is left. Every CTE reads the snapshot taken
+# before the DELETE, so the leaving player is excluded explicitly.
+LEAVE_ROOM_SQL = text("""
+WITH room AS (
+    SELECT id FROM rooms WHERE room_code = :room_code
+),
+gone AS (
+    DELETE FROM players p
+    USING room r
+    WHERE p.room_id = r.id AND p.player_id = :player_id
+    RETURNING p.room_id, p.is_host
+),
+next_host AS (
+    SELECT p.id, p.room_id, p.player_id
+    FROM players p
+    JOIN gone g ON g.room_id = p.room_id
+    WHERE g.is_host AND p.player_id <> :player_id
+    ORDER BY p.joined_at, p.id
+    LIMIT 1
+),
+promoted AS (
+    UPDATE players SET is_host = true
+    FROM next_host n
+    WHERE players.id = n.id
+    RETURNING players.player_id
+),
+rehosted AS (
+    UPDATE rooms SET host_id = n.player_id, version = rooms.version + 1
+    FROM next_host n
+    WHERE rooms.id = n.room_id
+    RETURNING rooms.id
+),
+dropped AS (
+    DELETE FROM rooms
+    USING gone g
+    WHERE rooms.id = g.room_id
+      AND NOT EXISTS (
+          SELECT 1 FROM players p
+          WHERE p.room_id = g.room_id AND p.player_id <> :player_id
+      )
+    RETURNING rooms.id
+)
+SELECT
+    EXISTS (SELECT 1 FROM room) AS room_found,
+    EXISTS (SELECT 1 FROM dropped) AS room_deleted,
+    (SELECT count(*) FROM rehosted) AS rehosted
+""")
 
-def leave_room(db: Session, room: Room, player_id: str) -> bool:
-    """Remove a player from a room. Returns True if room should be deleted."""
-    player = db.query(Player).filter(
-        Player.room_id == room.id,
-        Player.player_id == player_id
-    ).first()
 
-    if not player:
-        return False
+def leave_room(db: Session, room_code: str, player_id: str) -> bool | None:
+    """Remove a player from a room in a single statement.
 
-    was_host = player.is_host
-    db.delete(player)
+    Returns None if the room does not exist, otherwise True if the room was
+    deleted because the last player left.
+    """
+    if is_sqlite:
+        return _leave_room_sqlite(db, room_code.upper(), player_id)
 
-    # Check remaining players
-    remaining = db.query(Player).filter(Player.room_id == room.id).all()
+    row = db.execute(
+        LEAVE_ROOM_SQL,
+        {"room_code": room_code.upper(), "player_id": player_id}
+    ).one()
+    db.commit()
+
+    if not row.room_found:
+        return None
+    return row.room_deleted
+
+
+def _leave_room_sqlite(db: Session, room_code: str, player_id: str) -> bool | None:
+    """SQLite has no data-modifying CTEs; run the same steps in one write transaction."""
+    room_id = select(Room.id).where(Room.room_code == room_code).scalar_subquery()
+    gone = db.execute(
+        delete(Player).where(
+            Player.room_id == room_id,
+            Player.player_id == player_id
+        ).returning(Player.room_id, Player.is_host),
+        execution_options={"synchronize_session": False}
+    ).first()
 
-    if not remaining:
-        # No players left, delete room
-        db.delete(room)
+    if not gone:
+        room_found = db.execute(select(room_id)).scalar() is not None
+        db.rollback()
+        return None if not room_found else False
+
+    next_host = db.execute(
+        select(Player.id, Player.player_id).where(
+            Player.room_id == gone.room_id
+        ).order_by(Player.joined_at, Player.id).limit(1)
+    ).first()
+
+    if not next_host:
+        db.execute(
+            delete(Room).where(Room.id == gone.room_id),
+            execution_options={"synchronize_session": False}
+        )
         db.commit()
         return True
 
-    # If host left, assign new host
-    if was_host and remaining:
-        remaining[0].is_host = True
-        room.host_id = remaining[0].player_id
+    if gone.is_host:
+        db.execute(
+            update(Player).where(Player.id == next_host.id).values(is_host=True),
+            execution_options={"synchronize_session": False}
+        )
+        db.execute(
+            update(Room).where(Room.id == gone.room_id).values(
+                host_id=next_host.player_id,
+                version=Room.version + 1
+            ),
+            execution_options={"synchronize_session": False}
+        )
 
     db.commit()
     return False
 
 
 def update_room_status(db: Session, room: Room, status: str) -> Room:
-    """Update room status."""
+    """Update room status.
+
+    The UPDATE is conditional on room.version; raises StaleDataError if the
+    room changed since it was loaded.
+    """
     room.status = status
     db.commit()
     db.refresh(room)
@@ -0,0 +1,109 @@
+"""Memory and latency of ConnectionManager at 100k connections across 10k rooms.
+
+Compares the indexed tuple registry with the previous set-of-tuples layout.
+Run from the backend directory:
+    python -m benchmarks.bench_connections
+"""
+import asyncio
+import random
+import time
+import tracemalloc
+from app.routers.websocket import ConnectionManager
+
+CONNECTIONS = 100_000
+ROOMS = 10_000
+SAMPLES = 20_000
+
+
+class FakeWebSocket:
+    __slots__ = ()
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        pass
+
+
+class LegacyConnectionManager:
+    """The previous registry: room_code -> set of (websocket, player_id)."""
+
+    def __init__(self):
+        self.rooms = {}
+
+    async def connect(self, websocket, room_code, player_id):
+        await websocket.accept()
+        if room_code not in self.rooms:
+            self.rooms[room_code] = set()
+        self.rooms[room_code].add((websocket, player_id))
+
+    async def broadcast_to_room(self, room_code, message, exclude_player=None):
+        if room_code not in self.rooms:
+            return
+        for ws, pid in self.rooms[room_code].copy():
+            if exclude_player and pid == exclude_player:
+                continue
+            try:
+                await ws.send_json(message)
+            except Exception:
+                self.rooms[room_code].discard((ws, pid))
+
+    async def send_to_player(self, room_code, player_id, message):
+        if room_code not in self.rooms:
+            return
+        for ws, pid in self.rooms[room_code]:
+            if pid == player_id:
+                try:
+                    await ws.send_json(message)
+                except Exception:
+                    pass
+                break
+
+
+async def run(manager_cls):
+    sockets = [FakeWebSocket() for _ in range(CONNECTIONS)]
+    # Every tenth player has a second tab open
+    members = [
+        (f"R{i % ROOMS:05d}", f"player-{i if i % 10 else i - 1}")
+        for i in range(CONNECTIONS)
+    ]
+
+    tracemalloc.start()
+    manager = manager_cls()
+    start = time.perf_counter()
+    for websocket, (room_code, player_id) in zip(sockets, members):
+        await manager.connect(websocket, room_code, player_id)
+    connect_time = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = random.Random(0)
+    targets = [members[rng.randrange(CONNECTIONS)] for _ in range(SAMPLES)]
+    message = {"type": "card_drawn"}
+
+    start = time.perf_counter()
+    for room_code, _ in targets:
+        await manager.broadcast_to_room(room_code, message)
+    broadcast_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for room_code, player_id in targets:
+        await manager.send_to_player(room_code, player_id, message)
+    direct_time = time.perf_counter() - start
+
+    return memory, connect_time, broadcast_time, direct_time
+
+
+def main():
+    print(f"{CONNECTIONS} connections across {ROOMS} rooms, {SAMPLES} sends each")
+    print(f"{'registry':>10} {'memory (MB)':>12} {'connect (us)':>13} {'broadcast (us)':>15} {'direct (us)':>12}")
+    for name, manager_cls in (("legacy", LegacyConnectionManager), ("indexed", ConnectionManager)):
+        memory, connect_time, broadcast_time, direct_time = asyncio.run(run(manager_cls))
+        print(
+            f"{name:>10} {memory / 1e6:>12.1f} {connect_time / CONNECTIONS * 1e6:>13.2f} "
+            f"{broadcast_time / SAMPLES * 1e6:>15.2f} {direct_time / SAMPLES * 1e6:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Draw and switch latency over the WebSocket, on the configured database.
+
+Starts the app with uvicorn in-process, creates a room with a custom deck,
+starts the game and times draw_card / switch_card until the matching
+card_drawn / card_switched event arrives. Each command is measured twice:
+with prefetching disabled (every draw scans the deck) and with the
+prefetched reservations. Uses DATABASE_URL like the app does, so running it
+once per backend compares them directly:
+
+    DATABASE_URL=postgresql://localhost/card_game python -m benchmarks.bench_draws
+    DATABASE_URL=sqlite:///./card_game.db python -m benchmarks.bench_draws
+
+Run from the backend directory:
+    python -m benchmarks.bench_draws [commands] [deck size]
+"""
+import asyncio
+import json
+import statistics
+import sys
+import threading
+import time
+import httpx
+import orjson
+import uvicorn
+import websockets
+from app.main import app
+from app.services.prefetch_service import prefetcher
+from .bench_idle_websockets import free_port
+
+# Pause between commands, like players reading a card; gives refills time to land
+THINK_SECONDS = 0.02
+
+EVENTS = {"draw_card": "card_drawn", "switch_card": "card_switched"}
+
+
+async def command_latency(ws, command: str, count: int) -> tuple[list[float], int]:
+    """Time count commands. Returns the samples and how many were prefetched."""
+    samples = []
+    prefetched = 0
+    for _ in range(count):
+        start = time.perf_counter()
+        await ws.send(json.dumps({"type": command}))
+        while True:
+            message = json.loads(await ws.recv())
+            if message["type"] == EVENTS[command]:
+                break
+            if message["type"] == "error":
+                raise RuntimeError(message["message"])
+        samples.append(time.perf_counter() - start)
+        prefetched += message.get("prefetched") is not None
+        await asyncio.sleep(THINK_SECONDS)
+    return samples, prefetched
+
+
+def summary(samples: list[float]) -> tuple[float, float]:
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.95)] * 1000
+
+
+async def main(count: int, deck_size: int):
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        room = (await client.post("/api/rooms", json={"host_nickname": "bench", "host_id": "bench-host"})).json()
+        room_code = room["room_code"]
+
+        deck = b"".join(
+            orjson.dumps({"type": "question", "content": f"Bench question {i}?"}) + b"\n"
+            for i in range(deck_size)
+        )
+        response = await client.post(
+            f"/api/questions/custom/{room_code}/import",
+            files={"file": ("deck.ndjson", deck)}
+        )
+        response.raise_for_status()
+
+        depth = prefetcher.depth
+        print(f"{'command':>12} {'prefetch':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'prefetched':>11}")
+        async with websockets.connect(f"ws://127.0.0.1:{port}/ws/{room_code}/bench-host") as ws:
+            await ws.recv()  # game_state
+            prefetcher.depth = 0
+            await ws.send(json.dumps({"type": "start_game"}))
+
+            for enabled in (False, True):
+                # Refills never top up a zero-depth queue, so every draw scans
+                prefetcher.depth = depth if enabled else 0
+                for command in EVENTS:
+                    samples, prefetched = await command_latency(ws, command, count)
+                    p50, p95 = summary(samples)
+                    print(f"{command:>12} {'on' if enabled else 'off':>9} "
+                          f"{p50:>9.2f} {p95:>9.2f} {prefetched:>5}/{count:<5}")
+
+        prefetcher.depth = depth
+        # Leaving deletes the room and its history first, which still references the deck
+        custom = (await client.get(f"/api/questions/custom/{room_code}")).json()
+        await client.delete(f"/api/rooms/{room_code}/leave/bench-host")
+        for question in custom:
+            await client.delete(f"/api/questions/{question['id']}", params={"room_code": room_code})
+
+    server.should_exit = True
+    thread.join()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    ))
@@ -0,0 +1,77 @@
+"""REST latency with many idle WebSocket clients connected.
+
+Starts the app with uvicorn in-process, measures GET /api/rooms/{code}
+latency, connects the idle clients, and measures again. Uses DATABASE_URL
+like the app does; with sessions held per socket, REST requests would block
+once the idle sockets had checked out the whole pool.
+
+Run from the backend directory:
+    python -m benchmarks.bench_idle_websockets [clients]
+"""
+import asyncio
+import socket
+import statistics
+import sys
+import threading
+import time
+import httpx
+import uvicorn
+import websockets
+from app.main import app
+
+REQUESTS = 200
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def rest_latency(client: httpx.AsyncClient, path: str) -> tuple[float, float]:
+    samples = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        response = await client.get(path, timeout=30)
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.95)] * 1000
+
+
+async def main(clients: int):
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", ws_max_queue=4))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        room = (await client.post("/api/rooms", json={"host_nickname": "bench", "host_id": "bench-host"})).json()
+        path = f"/api/rooms/{room['room_code']}"
+
+        p50, p95 = await rest_latency(client, path)
+        print(f"{'idle sockets':>12} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+        print(f"{0:>12} {p50:>9.2f} {p95:>9.2f}")
+
+        sockets = []
+        for i in range(clients):
+            ws = await websockets.connect(f"ws://127.0.0.1:{port}/ws/{room['room_code']}/idle-{i}")
+            await ws.recv()  # game_state
+            sockets.append(ws)
+
+        p50, p95 = await rest_latency(client, path)
+        print(f"{clients:>12} {p50:>9.2f} {p95:>9.2f}")
+
+        for ws in sockets:
+            await ws.close()
+        await client.delete(f"{path}/leave/bench-host")
+
+    server.should_exit = True
+    thread.join()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,72 @@
+"""Compare ORM + response_model serialization with the column/orjson fast path.
+
+Run from the backend directory:
+    python -m benchmarks.bench_serialization
+"""
+import json
+import time
+from typing import List
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from app.database import Base
+from app.models import Question
+from app.responses import FastJSONResponse
+from app.schemas import QuestionResponse
+from app.services import game_service
+
+SIZES = (10, 1_000, 50_000)
+
+question_list = TypeAdapter(List[QuestionResponse])
+
+
+def orm_path(db: Session) -> bytes:
+    """What FastAPI does for response_model=List[QuestionResponse] on ORM objects."""
+    questions = db.query(Question).filter(Question.is_system == True).all()
+    validated = question_list.validate_python(questions, from_attributes=True)
+    return JSONResponse(question_list.dump_python(validated, mode="json")).body
+
+
+def fast_path(db: Session) -> bytes:
+    questions = game_service.get_system_questions(db)
+    return FastJSONResponse(questions).body
+
+
+def best_of(fn, db: Session, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        db.expunge_all()
+        start = time.perf_counter()
+        fn(db)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    print(f"{'questions':>10} {'orm (ms)':>10} {'fast (ms)':>10} {'speedup':>8}")
+    for size in SIZES:
+        engine = create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+        Base.metadata.create_all(bind=engine)
+        with Session(engine) as db:
+            db.execute(Question.__table__.insert(), [
+                {"content": f"Question {i}?", "is_system": True, "created_by": None}
+                for i in range(size)
+            ])
+            db.commit()
+
+            assert json.loads(orm_path(db)) == json.loads(fast_path(db))
+            repeats = max(3, 20_000 // size)
+            orm = best_of(orm_path, db, repeats)
+            fast = best_of(fast_path, db, repeats)
+            print(f"{size:>10} {orm * 1000:>10.2f} {fast * 1000:>10.2f} {orm / fast:>7.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Export a room's history and custom deck as NDJSON, or import a deck back.
+
+Usage:
+    python export_room.py export ROOMCODE [-o room.ndjson.gz]
+    python export_room.py import ROOMCODE room.ndjson.gz
+"""
+import argparse
+import sys
+from app.database import SessionLocal
+from app.services import export_service, room_service
+
+
+def export_room(room_code: str, output: str | None):
+    """Write the export to a file (gzip if it ends in .gz) or stdout."""
+    compress = bool(output and output.endswith(".gz"))
+    out = open(output, "wb") if output else sys.stdout.buffer
+    try:
+        for chunk in export_service.stream_room_export(room_code, compress):
+            out.write(chunk)
+    finally:
+        if output:
+            out.close()
+
+
+def import_deck(room_code: str, path: str):
+    """Bulk insert the custom deck from an export file into a room."""
+    db = SessionLocal()
+    try:
+        room = room_service.get_room_by_code(db, room_code)
+        if not room:
+            sys.exit(f"Room {room_code} not found")
+        with open(path, "rb") as f:
+            imported = export_service.import_custom_questions(
+                db, room.room_code, export_service.iter_ndjson(f)
+            )
+        print(f"Imported {imported} questions into room {room.room_code}", file=sys.stderr)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="Export a room")
+    export_parser.add_argument("room_code")
+    export_parser.add_argument("-o", "--output", help="Output file (.gz to compress), default stdout")
+
+    import_parser = commands.add_parser("import", help="Import a custom deck into a room")
+    import_parser.add_argument("room_code")
+    import_parser.add_argument("path")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_room(args.room_code, args.output)
+    else:
+        import_deck(args.room_code, args.path)
@@ -1,6 +1,7 @@
 """Initialize database tables and seed data."""
 from app.database import engine, Base
 from app.models import Question, Room, Player, GameHistory
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
 
 def init_tables():
@@ -9,6 +10,33 @@ def init_tables():
     Base.metadata.create_all(bind=engine)
     print("Tables created successfully!")
 
+def upgrade_tables():
+    """Bring databases created by older versions up to the current schema.
+
+    create_all() never alters existing tables, so this adds what later
+    versions rely on. Every step is idempotent and safe to re-run.
+    """
+    print("Upgrading database schema...")
+    with engine.begin() as conn:
+        # join_room upserts with ON CONFLICT (room_id, player_id), which needs
+        # a unique index. Drop duplicate rows before adding it.
+        conn.execute(text(
+            "DELETE FROM players WHERE id NOT IN ("
+            "SELECT MIN(id) FROM players GROUP BY room_id, player_id)"
+        ))
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_players_room_player "
+            "ON players (room_id, player_id)"
+        ))
+
+        # Optimistic concurrency version for rooms
+        room_columns = {column["name"] for column in inspect(conn).get_columns("rooms")}
+        if "version" not in room_columns:
+            conn.execute(text(
+                "ALTER TABLE rooms ADD COLUMN version INTEGER NOT NULL DEFAULT 0"
+            ))
+    print("Schema is up to date!")
+
 def seed_questions():
     """Seed initial system questions."""
     from app.database import SessionLocal
@@ -84,4 +112,5 @@ def seed_questions():
 
 if __name__ == "__main__":
     init_tables()
+    upgrade_tables()
     seed_questions()
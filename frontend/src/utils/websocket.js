@@ -10,6 +10,7 @@ class GameWebSocket {
     this.reconnectAttempts = 0
     this.maxReconnectAttempts = 5
     this.reconnectDelay = 2000
+    this.prefetched = []
   }
 
   connect(roomCode, playerId) {
@@ -78,10 +79,50 @@ class GameWebSocket {
 
   handleMessage(data) {
     const { type } = data
+
+    // Server heartbeat; a missed reply gets the connection dropped
+    if (type === 'ping') {
+      this.send('pong')
+      return
+    }
+
+    this.trackPrefetched(data)
     this.emit(type, data)
     this.emit('message', data)
   }
 
+  // Cards the server reserved ahead, in draw order ({ key, card } entries)
+  trackPrefetched(data) {
+    switch (data.type) {
+      case 'game_state':
+        this.prefetched = data.prefetched || []
+        break
+      case 'cards_prefetched':
+        this.prefetched.push(...data.cards)
+        break
+      case 'prefetch_revoked':
+        this.prefetched = this.prefetched.filter(entry => !data.keys.includes(entry.key))
+        break
+      case 'card_drawn':
+      case 'card_switched':
+        if (data.prefetched) {
+          const entry = this.prefetched.find(e => e.key === data.prefetched)
+          if (entry && !data.card) data.card = entry.card
+          this.prefetched = this.prefetched.filter(e => e.key !== data.prefetched)
+        }
+        break
+      case 'game_ended':
+      case 'game_restarted':
+        this.prefetched = []
+        break
+    }
+  }
+
+  // The card the next draw or switch will most likely reveal
+  nextPrefetchedCard() {
+    return this.prefetched.length ? this.prefetched[0].card : null
+  }
+
   send(type, data = {}) {
     const message = JSON.stringify({ type, ...data })
 
@@ -176,6 +217,7 @@ class GameWebSocket {
     this.roomCode = null
     this.playerId = null
     this.listeners = {}
+    this.prefetched = []
   }
 }
 